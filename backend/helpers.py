@@ -1,12 +1,27 @@
-from datetime import datetime, timezone
-import random
-import string
-
-def ensure_utc(dt: datetime) -> datetime:
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+from bisect import bisect_right
+from datetime import date, datetime, time, timezone
+from typing import Optional, Sequence
+import base64
+import secrets
 
 def generate_code(length: int = 6) -> str:
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choices(chars, k=length))
\ No newline at end of file
+    # Base32 (A-Z, 2-7) carries 5 bits per character
+    raw = secrets.token_bytes((length * 5 + 7) // 8)
+    return base64.b32encode(raw)[:length].decode()
+
+def utc_from_timestamp(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+def day_start_timestamp(d: date) -> int:
+    return int(datetime.combine(d, time.min, tzinfo=timezone.utc).timestamp())
+
+def find_free_slot(
+    starts: Sequence[int], ends: Sequence[int], start_ts: int, end_ts: int
+) -> Optional[int]:
+    # starts/ends are sorted, non-overlapping intervals, so only the
+    # neighbours around the insertion point can overlap the new one.
+    # Returns the insertion index, or None if the interval is taken.
+    i = bisect_right(starts, start_ts)
+    if (i > 0 and ends[i - 1] > start_ts) or (i < len(starts) and starts[i] < end_ts):
+        return None
+    return i
\ No newline at end of file
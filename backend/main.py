@@ -1,10 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
-from uuid import uuid4
-from datetime import date, datetime, timezone
+import orjson
+from bisect import bisect_left
+from datetime import date
 from models import CancelResponse, BookingRequest, BookingResponse
-from storage import rooms, bookings
+from storage import rooms, room_names, starts, ends, codes, code_index, room_locks
+from helpers import day_start_timestamp, utc_from_timestamp
 from services import create_booking_service
 
 app = FastAPI()
@@ -19,44 +21,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# The room list never changes, so encode it once
+ROOMS_JSON = orjson.dumps(list(room_names))
+
 @app.get("/rooms", response_model=List[str])
-def get_rooms():
-    return rooms
+async def get_rooms():
+    return Response(content=ROOMS_JSON, media_type="application/json")
 
 @app.get("/bookings/{room}", response_model=List[BookingResponse])
-def get_room_bookings(
+async def get_room_bookings(
     room: str,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
 ):
-    room_bookings = bookings.get(room, [])
+    if room not in rooms:
+        return Response(content=b"[]", media_type="application/json")
+
+    room_starts = starts[room]
+    room_ends = ends[room]
+    room_codes = codes[room]
 
+    # Bookings are sorted by start, so the date range is a contiguous slice
+    lo, hi = 0, len(room_starts)
     if start_date and end_date:
-        room_bookings = [
-            b for b in room_bookings
-            if start_date <= b["start"].date() <= end_date
-        ]
+        lo = bisect_left(room_starts, day_start_timestamp(start_date))
+        # Step to the next day on the timestamp, date(9999, 12, 31) + 1 day overflows
+        hi = bisect_left(room_starts, day_start_timestamp(end_date) + 86400)
 
-    return room_bookings
+    room_bookings = [
+        {
+            "room": room,
+            "start": utc_from_timestamp(start_ts),
+            "end": utc_from_timestamp(end_ts),
+            "code": code,
+        }
+        for start_ts, end_ts, code in zip(
+            room_starts[lo:hi], room_ends[lo:hi], room_codes[lo:hi]
+        )
+    ]
+
+    # Serialize with orjson and skip response_model validation, the data
+    # comes straight from storage
+    return Response(
+        content=orjson.dumps(room_bookings, option=orjson.OPT_UTC_Z),
+        media_type="application/json",
+    )
 
 @app.post("/book", response_model=BookingResponse)
-def create_booking(booking: BookingRequest):
-    return create_booking_service(
+async def create_booking(booking: BookingRequest):
+    return await create_booking_service(
         booking.room,
         booking.start,
         booking.end
     )
 
 @app.delete("/bookings/cancel/{code}", response_model=CancelResponse)
-def cancel_booking(code: str):
-    for room, room_bookings in bookings.items():
-        for booking in room_bookings:
-            if booking["code"] == code:
-                room_bookings.remove(booking)
-                return CancelResponse(
-                    room=booking["room"],
-                    start=booking["start"],
-                    end=booking["end"],
-                )
-
-    raise HTTPException(status_code=404, detail="Invalid cancellation code")
+async def cancel_booking(code: str):
+    entry = code_index.get(code)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Invalid cancellation code")
+
+    room, start_ts = entry
+    async with room_locks[room]:
+        # The code may have been cancelled, or even reissued, while waiting
+        # for the lock. Only remove the booking the entry was read for.
+        if code_index.get(code) is not entry:
+            raise HTTPException(status_code=404, detail="Invalid cancellation code")
+        del code_index[code]
+
+        # Starts are unique within a room, so bisect gives the booking's position
+        i = bisect_left(starts[room], start_ts)
+        del starts[room][i]
+        del codes[room][i]
+        end_ts = ends[room].pop(i)
+
+    return CancelResponse(
+        room=room,
+        start=utc_from_timestamp(start_ts),
+        end=utc_from_timestamp(end_ts),
+    )
@@ -1,19 +1,25 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
 # Pydantic models
 class BookingRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     room: str
     start: datetime
     end: datetime
 
 class BookingResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     room: str
     start: datetime
     end: datetime
     code: str
 
 class CancelResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     room: str
     start: datetime
     end: datetime
\ No newline at end of file
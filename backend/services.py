@@ -1,24 +1,42 @@
+import math
 from datetime import datetime, timezone
 from fastapi import HTTPException
-from uuid import uuid4
-from storage import rooms, bookings
-from helpers import ensure_utc, generate_code
+from models import BookingResponse
+from storage import rooms, starts, ends, codes, code_index, room_locks
+from helpers import find_free_slot, generate_code, utc_from_timestamp
 
 MAX_DURATION_HOURS = 3  # maximum allowed booking length
 
-def create_booking_service(room: str, start: datetime, end: datetime):
+# Epoch-second bounds of the current year, refreshed when the year changes
+_year_cache = {"year": 0, "lo": 0, "hi": 0}
+
+def _current_year_bounds(now: datetime) -> tuple[int, int]:
+    now_ts = now.timestamp()
+    if not _year_cache["lo"] <= now_ts < _year_cache["hi"]:
+        _year_cache["year"] = now.year
+        _year_cache["lo"] = int(datetime(now.year, 1, 1, tzinfo=timezone.utc).timestamp())
+        _year_cache["hi"] = int(datetime(now.year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    return _year_cache["lo"], _year_cache["hi"]
+
+async def create_booking_service(room: str, start: datetime, end: datetime) -> BookingResponse:
 
     # Check that the room exists
     if room not in rooms:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    # Normalize timezones
-    start = ensure_utc(start)
-    end = ensure_utc(end)
+    # Treat naive times as UTC and work with epoch seconds from here on
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    # Round the end up so a sub-second overrun still counts against the
+    # duration cap and the next slot. Starts are checked to be on the hour.
+    start_ts = int(start.timestamp())
+    end_ts = math.ceil(end.timestamp())
     now = datetime.now(timezone.utc)
     
     # Prevent start time from being after end time
-    duration = (end - start).total_seconds() / 3600
+    duration = (end_ts - start_ts) / 3600
     if duration <= 0:
         raise HTTPException(status_code=400, detail="Start time must be before end time")
 
@@ -30,47 +48,53 @@ def create_booking_service(room: str, start: datetime, end: datetime):
         )
     
     # Prevent bookings from the past
-    if start < now:
+    if start_ts < now.timestamp():
         raise HTTPException(
             status_code=400,
             detail="Cannot book a time that has already passed",
         )
     
-    # Only allow start times on the hour
-    if start.minute != 0 or start.second != 0 or start.microsecond != 0:
+    # Only allow start times on the hour. start_ts is truncated to whole
+    # seconds, so sub-second starts are checked separately
+    if start_ts % 3600 or start.microsecond:
         raise HTTPException(
             status_code=400,
             detail="Start time must be at the beginning of the hour"
         )
 
     # Only allow bookings in the current year
-    if start.year != now.year or end.year != now.year:
+    year_lo, year_hi = _current_year_bounds(now)
+    if start_ts < year_lo or end_ts >= year_hi:
         raise HTTPException(
             status_code=400,
-            detail=f"Bookings must be within the current year ({now.year})"
+            detail=f"Bookings must be within the current year ({_year_cache['year']})"
         )
     
-    # Prevent double booking
-    room_bookings = bookings.get(room, [])
-    for b in room_bookings:
-        existing_start = ensure_utc(b["start"])
-        existing_end = ensure_utc(b["end"])
-
-        if not (end <= existing_start or start >= existing_end):
+    async with room_locks[room]:
+        # Prevent double booking
+        room_starts = starts[room]
+        room_ends = ends[room]
+        room_codes = codes[room]
+        i = find_free_slot(room_starts, room_ends, start_ts, end_ts)
+        if i is None:
             raise HTTPException(
                 status_code=400,
                 detail="Room is already booked for that time slot",
             )
         
-    # Book the room
-    code = generate_code()
-    new_booking = {
-        "room": room,
-        "start": start,
-        "end": end,
-        "code": code,
-    }
+        # Book the room
+        code = generate_code()
+        while code in code_index:
+            code = generate_code()
+        room_starts.insert(i, start_ts)
+        room_ends.insert(i, end_ts)
+        room_codes.insert(i, code)
+        code_index[code] = (room, start_ts)
 
-    room_bookings.append(new_booking)
-    bookings[room] = room_bookings
-    return new_booking
\ No newline at end of file
+        # Fields are already validated above, skip a second validation pass
+        return BookingResponse.model_construct(
+            room=room,
+            start=utc_from_timestamp(start_ts),
+            end=utc_from_timestamp(end_ts),
+            code=code,
+        )
\ No newline at end of file
@@ -1,4 +1,21 @@
+import asyncio
+import sys
+from array import array
+
 # In-memory database
-rooms = ["Room A", "Room B", "Room C"]
-bookings: dict[str, list[dict]] = {}
-# { room_name: [ { start, end, code, room } ] }
\ No newline at end of file
+room_names = tuple(sys.intern(room) for room in ("Room A", "Room B", "Room C"))
+rooms = frozenset(room_names)
+
+# Bookings are stored per room as parallel columns sorted by start time.
+# Times are UTC epoch seconds.
+starts: dict[str, array] = {room: array("q") for room in room_names}
+# { room_name: array('q', [start, ...]) }
+ends: dict[str, array] = {room: array("q") for room in room_names}
+# { room_name: array('q', [end, ...]) }
+codes: dict[str, list[str]] = {room: [] for room in room_names}
+# { room_name: [code, ...] }
+code_index: dict[str, tuple[str, int]] = {}
+# { code: (room_name, start) }
+
+# Serializes writes to each room's bookings (booking creation and cancellation)
+room_locks = {room: asyncio.Lock() for room in room_names}
\ No newline at end of file